@@ -1,2 +1,3 @@
 from .plot_form_validator import PlotFormValidator
 from .plot_log_entry_form_validator import PlotLogEntryFormValidator
+from .plot_log_entry_formset_validator import PlotLogEntryFormSetValidator
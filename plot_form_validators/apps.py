@@ -1,5 +1,10 @@
 from django.apps import AppConfig as DjangoAppConfig
+from django.core.checks import register
 
 
 class AppConfig(DjangoAppConfig):
     name = 'plot_form_validators'
+
+    def ready(self):
+        from .checks import circuit_breaker_check
+        register(circuit_breaker_check)
@@ -0,0 +1,13 @@
+from django.core.checks import Error
+
+from .circuit_breaker import CircuitBreakerError
+from .lookup import circuit_breaker
+
+
+def circuit_breaker_check(app_configs, **kwargs):
+    errors = []
+    try:
+        circuit_breaker.fallback
+    except CircuitBreakerError as e:
+        errors.append(Error(str(e), id='plot_form_validators.E001'))
+    return errors
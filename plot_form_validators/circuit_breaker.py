@@ -0,0 +1,233 @@
+import threading
+import time
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from django import forms
+from django.conf import settings
+from django.db import connection, transaction, DatabaseError, OperationalError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+REJECT = 'reject'
+CACHED = 'cached'
+
+MYSQL_QUERY_TIMEOUT = 3024  # ER_QUERY_TIMEOUT
+POSTGRESQL_QUERY_CANCELED = '57014'
+
+
+class CircuitBreakerError(Exception):
+    pass
+
+
+@contextmanager
+def statement_timeout(timeout):
+    """Limits queries run in the block to `timeout` seconds.
+
+    Supported for mysql and postgresql, a no-op otherwise. Queries
+    in the block must be read-only. On postgresql the block runs in
+    a savepoint that is rolled back, which also discards the
+    `SET LOCAL`, so a cancelled query does not break an enclosing
+    transaction and the timeout does not outlive the block.
+    """
+    milliseconds = int(timeout * 1000)
+    if connection.vendor == 'postgresql':
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET LOCAL statement_timeout = %s', [milliseconds])
+            yield
+            transaction.set_rollback(True)
+    elif connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SET SESSION max_execution_time = %s', [milliseconds])
+        try:
+            yield
+        except Exception:
+            # do not hide the original error if the connection is broken
+            try:
+                reset_mysql_statement_timeout()
+            except DatabaseError:
+                pass
+            raise
+        reset_mysql_statement_timeout()
+    else:
+        yield
+
+
+def reset_mysql_statement_timeout():
+    with connection.cursor() as cursor:
+        cursor.execute('SET SESSION max_execution_time = DEFAULT')
+
+
+def is_timeout(exc):
+    """Returns True if the OperationalError was raised because the
+    statement timeout was exceeded.
+    """
+    if getattr(exc.__cause__, 'pgcode', None) == POSTGRESQL_QUERY_CANCELED:
+        return True
+    return bool(exc.args) and exc.args[0] == MYSQL_QUERY_TIMEOUT
+
+
+class CircuitBreaker:
+
+    """Bounds the latency of validator lookups.
+
+    Each lookup runs with a statement timeout of `timeout` seconds. A
+    lookup that times out or takes longer than `timeout` counts as slow;
+    after `threshold` consecutive slow lookups the breaker trips (opens)
+    for `reset_timeout` seconds. It then lets a single probe lookup
+    through (half open); the breaker closes if the probe is fast and
+    opens again if not. While open, and for callers other than the
+    probe while half open, lookups are not run and the `fallback`
+    policy applies:
+
+        * 'reject': raise a ValidationError with code 'retry';
+        * 'cached': return the last answer for the key, or reject
+          if there is none.
+
+    Lookups called with `cacheable=False` are always rejected.
+
+    Database errors other than a timeout are raised as is.
+
+    `state`, `slow_count` and `trip_count` may be inspected to tune
+    the settings.
+
+    Options not given are read from settings when used:
+    PLOT_FORM_VALIDATORS_LOOKUP_TIMEOUT, PLOT_FORM_VALIDATORS_BREAKER_THRESHOLD,
+    PLOT_FORM_VALIDATORS_BREAKER_RESET_TIMEOUT and
+    PLOT_FORM_VALIDATORS_BREAKER_FALLBACK.
+    """
+
+    cache_size = 1000
+
+    def __init__(self, timeout=None, threshold=None, reset_timeout=None,
+                 fallback=None):
+        self._timeout = timeout
+        self._threshold = threshold
+        self._reset_timeout = reset_timeout
+        self._fallback_policy = fallback
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.reset()
+
+    @property
+    def timeout(self):
+        return self._option(
+            self._timeout, 'PLOT_FORM_VALIDATORS_LOOKUP_TIMEOUT', 2.0)
+
+    @property
+    def threshold(self):
+        return self._option(
+            self._threshold, 'PLOT_FORM_VALIDATORS_BREAKER_THRESHOLD', 3)
+
+    @property
+    def reset_timeout(self):
+        return self._option(
+            self._reset_timeout, 'PLOT_FORM_VALIDATORS_BREAKER_RESET_TIMEOUT', 30.0)
+
+    @property
+    def fallback(self):
+        fallback = self._option(
+            self._fallback_policy, 'PLOT_FORM_VALIDATORS_BREAKER_FALLBACK', REJECT)
+        if fallback not in [REJECT, CACHED]:
+            raise CircuitBreakerError(
+                f'Invalid fallback. Expected one of {[REJECT, CACHED]}. '
+                f'Got \'{fallback}\'.')
+        return fallback
+
+    def _option(self, value, setting_name, default):
+        if value is not None:
+            return value
+        return getattr(settings, setting_name, default)
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._probing = False
+            self.opened_at = None
+            self.slow_count = 0
+            self.trip_count = 0
+            self._cache.clear()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._get_state()
+
+    def _get_state(self):
+        if (self._state == OPEN
+                and time.monotonic() - self.opened_at >= self.reset_timeout):
+            self._state = HALF_OPEN
+        return self._state
+
+    def call(self, key, fn, cacheable=True):
+        """Returns the result of `fn` or, if the breaker is open or the
+        lookup times out, the result of the fallback policy.
+
+        Set `cacheable=False` for lookups that must never be answered
+        from the cache, such as permission checks; these are always
+        rejected when the lookup is not run.
+        """
+        timeout = self.timeout
+        fallback = self.fallback
+        with self._lock:
+            state = self._get_state()
+            if state == OPEN or (state == HALF_OPEN and self._probing):
+                return self._fallback(key, fallback, cacheable)
+            is_probe = state == HALF_OPEN
+            self._probing = self._probing or is_probe
+        started = time.monotonic()
+        try:
+            with statement_timeout(timeout):
+                result = fn()
+        except OperationalError as e:
+            if not is_timeout(e):
+                raise
+            with self._lock:
+                self._record(is_probe, slow=True)
+                return self._fallback(key, fallback, cacheable)
+        else:
+            with self._lock:
+                self._record(
+                    is_probe, slow=time.monotonic() - started > timeout)
+                if cacheable:
+                    self._cache[key] = result
+                    self._cache.move_to_end(key)
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            return result
+        finally:
+            if is_probe:
+                with self._lock:
+                    self._probing = False
+
+    def _record(self, is_probe, slow=None):
+        """Updates the state for a completed lookup.
+
+        Only the probe may change a half open breaker and lookups
+        started before the breaker tripped do not change it.
+        """
+        if self._state != (HALF_OPEN if is_probe else CLOSED):
+            return None
+        if not slow:
+            self._state = CLOSED
+            self.slow_count = 0
+        else:
+            self.slow_count += 1
+            if is_probe or self.slow_count >= self.threshold:
+                self._state = OPEN
+                self.opened_at = time.monotonic()
+                self.slow_count = 0
+                self.trip_count += 1
+        return None
+
+    def _fallback(self, key, fallback, cacheable):
+        if cacheable and fallback == CACHED and key in self._cache:
+            return self._cache[key]
+        raise forms.ValidationError(
+            'Unable to validate at this time. Please try again.',
+            code='retry')
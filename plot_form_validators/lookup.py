@@ -0,0 +1,26 @@
+from django.db import connection
+
+from .circuit_breaker import CircuitBreaker
+from .single_flight import SingleFlight
+
+single_flight = SingleFlight()
+circuit_breaker = CircuitBreaker()
+
+
+def lookup(key, fn, cacheable=True):
+    """Returns the result of `fn`, sharing one in-flight call among
+    concurrent callers that use the same key.
+
+    Lookups inside an atomic block are not shared since the result
+    must reflect the caller's own transaction. Note that this includes
+    the admin change form and views under ATOMIC_REQUESTS; sharing
+    applies to validators run in autocommit mode, e.g. form validation
+    in views and API endpoints that are not wrapped in a transaction.
+
+    The call is bounded by `circuit_breaker`, see CircuitBreaker.
+    Set `cacheable=False` for permission checks.
+    """
+    if connection.in_atomic_block:
+        return circuit_breaker.call(key, fn, cacheable=cacheable)
+    return single_flight.do(
+        key, circuit_breaker.call, key, fn, cacheable=cacheable)
@@ -9,6 +9,8 @@ from edc_constants.utils import get_display
 from plot.choices import PLOT_STATUS
 from plot.constants import ACCESSIBLE, RESIDENTIAL_HABITABLE
 
+from .lookup import lookup
+
 
 class PlotFormValidator(FormValidator):
 
@@ -56,24 +58,40 @@ class PlotFormValidator(FormValidator):
         self.validate_radius_increase()
 
     def validate_plot_log(self):
-        try:
-            if not self.instance.plotlog.plotlogentry_set.filter(
-                    log_status=ACCESSIBLE).exists():
-                raise forms.ValidationError(
-                    'Complete the plot log "entry" before attempting '
-                    'to modify this plot.', code='plot_log_entry')
-        except ObjectDoesNotExist:
+        has_accessible_entry = lookup(
+            ('plot_log', self.instance.id), self.has_accessible_plot_log_entry)
+        if has_accessible_entry is None:
             raise forms.ValidationError(
                 'Complete the plot log before attempting '
                 'to modify this plot.', code='plot_log')
+        elif not has_accessible_entry:
+            raise forms.ValidationError(
+                'Complete the plot log "entry" before attempting '
+                'to modify this plot.', code='plot_log_entry')
+
+    def has_accessible_plot_log_entry(self):
+        """Returns None if the plot has no plot log, otherwise True
+        if the plot log has an accessible entry.
+        """
+        try:
+            plot_log = self.instance.plotlog
+        except ObjectDoesNotExist:
+            return None
+        return plot_log.plotlogentry_set.filter(log_status=ACCESSIBLE).exists()
 
     def validate_radius_increase(self):
         if self.target_radius != self.instance.target_radius:
-            if not self.current_user.groups.filter(
-                    name__in=self.supervisor_groups).exists():
+            if not self.is_supervisor:
                 raise forms.ValidationError(
                     {'target_radius': 'Insufficient permissions to change.'})
 
+    @property
+    def is_supervisor(self):
+        key = ('supervisor', self.current_user.id,
+               tuple(sorted(self.supervisor_groups or [])))
+        return lookup(key, lambda: self.current_user.groups.filter(
+            name__in=self.supervisor_groups).exists(), cacheable=False)
+
     def allow_new_plot_or_raise(self):
         """Raise if new plots not in allowed map_area and not ess
         and not residential.
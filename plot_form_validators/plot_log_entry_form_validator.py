@@ -4,11 +4,14 @@ from edc_base.modelform_validators import FormValidator
 
 from plot.constants import INACCESSIBLE, ACCESSIBLE
 
+from .lookup import lookup
+
 
 class PlotLogEntryFormValidator(FormValidator):
 
-    def __init__(self, **kwargs):
+    def __init__(self, confirmed=None, **kwargs):
         super().__init__(**kwargs)
+        self.confirmed = confirmed
         self.plot_log = self.cleaned_data.get('plot_log')
         self.accessible = True if self.cleaned_data.get(
             'log_status') == ACCESSIBLE else False
@@ -26,4 +29,7 @@ class PlotLogEntryFormValidator(FormValidator):
 
     @property
     def is_confirmed(self):
-        return self.plot_log.plot.confirmed
+        if self.confirmed is None:
+            self.confirmed = lookup(('plot_confirmed', self.plot_log.plot_id),
+                                    lambda: self.plot_log.plot.confirmed)
+        return self.confirmed
@@ -0,0 +1,80 @@
+from django import forms
+
+from .lookup import lookup
+from .plot_log_entry_form_validator import PlotLogEntryFormValidator
+
+
+class PlotLogEntryFormSetValidator:
+
+    """Validates the plot log entry forms of an inline formset.
+
+    Only changed or new forms are validated. The parent plot log and
+    its plot are loaded once and shared by every form validator, so
+    the cost scales with the changed rows, not the log history.
+
+    Errors are added to the offending forms and `_errors` maps the
+    form index to its errors.
+
+    Call from the formset's `clean`, for example:
+
+        PlotLogEntryFormSetValidator(
+            forms=self.forms, plot_log=self.instance).validate()
+    """
+
+    form_validator_cls = PlotLogEntryFormValidator
+
+    def __init__(self, forms=None, plot_log=None):
+        self.forms = forms or []
+        self.plot_log = plot_log
+        self._errors = {}
+        self._error_codes = []
+
+    def validate(self):
+        if not self.plot_log:
+            self._error_codes.append('plot_log')
+            raise forms.ValidationError(
+                'Complete the plot log before adding entries.', code='plot_log')
+        changed_forms = self.changed_forms
+        if not changed_forms:
+            return None
+        confirmed = lookup(('plot_confirmed', self.plot_log.plot_id),
+                           lambda: self.plot_log.plot.confirmed)
+        for index, form in changed_forms:
+            cleaned_data = dict(form.cleaned_data)
+            cleaned_data.update(plot_log=self.plot_log)
+            form_validator = self.form_validator_cls(
+                cleaned_data=cleaned_data, instance=form.instance,
+                confirmed=confirmed)
+            try:
+                form_validator.validate()
+            except forms.ValidationError as e:
+                self._errors.update({index: form_validator._errors})
+                self._error_codes.extend(form_validator._error_codes)
+                self.add_form_errors(form, e)
+        if self._errors:
+            raise forms.ValidationError(
+                'Correct the plot log entries below.', code='plot_log_entry')
+        return None
+
+    @property
+    def changed_forms(self):
+        """Returns a list of (index, form) for forms that are new or
+        changed, are otherwise valid and are not marked for deletion.
+        """
+        changed_forms = []
+        for index, form in enumerate(self.forms):
+            if (form.has_changed() and not form.errors
+                    and not form.cleaned_data.get('DELETE')):
+                changed_forms.append((index, form))
+        return changed_forms
+
+    def add_form_errors(self, form, error):
+        """Adds the errors to the form, as non-field errors
+        if the field is not on the form.
+        """
+        if hasattr(error, 'error_dict'):
+            for field, error_list in error.error_dict.items():
+                form.add_error(
+                    field if field in form.fields else None, error_list)
+        else:
+            form.add_error(None, error)
@@ -0,0 +1,65 @@
+import copy
+import threading
+
+
+class InFlightCall:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.callers = 1
+        self.result = None
+        self.exception = None
+
+
+class SingleFlight:
+
+    """Coalesces concurrent calls that share the same key into one call.
+
+    The first caller for a key runs the function, all callers that
+    arrive while it is still running wait for and share its result.
+    If the call raises, each waiter raises its own copy of the
+    exception. Nothing is kept once the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = InFlightCall()
+                self._calls[key] = call
+                is_leader = True
+            else:
+                call.callers += 1
+                is_leader = False
+        if is_leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.exception = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+        call.done.wait()
+        if call.exception is not None:
+            raise copy.copy(call.exception) from call.exception
+        return call.result
+
+    def callers(self, key):
+        """Returns the number of callers sharing the in-flight call
+        for `key`, including the leader.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            return call.callers if call else 0
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,321 @@
+import time
+
+from django import forms
+from django.contrib.auth.models import User, Group
+from django.db import connections, DEFAULT_DB_ALIAS, DatabaseError, OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from unittest import mock
+
+from plot.constants import ACCESSIBLE, INACCESSIBLE
+
+from ..circuit_breaker import CircuitBreaker, CircuitBreakerError
+from ..circuit_breaker import CLOSED, OPEN, HALF_OPEN, REJECT, CACHED
+from ..circuit_breaker import MYSQL_QUERY_TIMEOUT, POSTGRESQL_QUERY_CANCELED
+from ..checks import circuit_breaker_check
+from ..circuit_breaker import is_timeout, statement_timeout
+from ..lookup import circuit_breaker
+from ..plot_form_validator import PlotFormValidator
+from ..plot_log_entry_form_validator import PlotLogEntryFormValidator
+from .models import Plot, PlotLog, PlotLogEntry
+
+
+def slow_lookup():
+    time.sleep(0.02)
+    return True
+
+
+def timed_out_lookup():
+    raise OperationalError(
+        MYSQL_QUERY_TIMEOUT, 'Query execution was interrupted')
+
+
+class TestCircuitBreaker(SimpleTestCase):
+
+    def make_breaker(self, **kwargs):
+        options = dict(timeout=0.01, threshold=2, reset_timeout=60,
+                       fallback=REJECT)
+        options.update(**kwargs)
+        return CircuitBreaker(**options)
+
+    def test_invalid_fallback(self):
+        breaker = self.make_breaker(fallback='blah')
+        self.assertRaises(
+            CircuitBreakerError, getattr, breaker, 'fallback')
+        self.assertRaises(
+            CircuitBreakerError, breaker.call, 'key', lambda: 1)
+
+    def test_invalid_fallback_check(self):
+        self.assertEqual(circuit_breaker_check(None), [])
+        with override_settings(PLOT_FORM_VALIDATORS_BREAKER_FALLBACK='blah'):
+            errors = circuit_breaker_check(None)
+        self.assertEqual(
+            [error.id for error in errors], ['plot_form_validators.E001'])
+
+    def test_options_read_from_settings(self):
+        breaker = CircuitBreaker()
+        self.assertEqual(breaker.threshold, 3)
+        with override_settings(PLOT_FORM_VALIDATORS_BREAKER_THRESHOLD=7,
+                               PLOT_FORM_VALIDATORS_BREAKER_FALLBACK=CACHED):
+            self.assertEqual(breaker.threshold, 7)
+            self.assertEqual(breaker.fallback, CACHED)
+
+    def test_falsy_option_not_ignored(self):
+        breaker = self.make_breaker(threshold=0)
+        self.assertEqual(breaker.threshold, 0)
+        breaker.call('key', slow_lookup)
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_fast_lookup(self):
+        breaker = self.make_breaker()
+        self.assertEqual(breaker.call('key', lambda: 1), 1)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.slow_count, 0)
+
+    def test_slow_lookup_returns_result(self):
+        breaker = self.make_breaker()
+        self.assertTrue(breaker.call('key', slow_lookup))
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.slow_count, 1)
+
+    def test_trips_after_threshold(self):
+        breaker = self.make_breaker()
+        breaker.call('key', slow_lookup)
+        breaker.call('key', slow_lookup)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.trip_count, 1)
+
+    def test_fast_lookup_resets_slow_count(self):
+        breaker = self.make_breaker()
+        breaker.call('key', slow_lookup)
+        breaker.call('key', lambda: 1)
+        breaker.call('key', slow_lookup)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.slow_count, 1)
+
+    def test_timed_out_lookup_rejects(self):
+        breaker = self.make_breaker()
+        with self.assertRaises(forms.ValidationError) as cm:
+            breaker.call('key', timed_out_lookup)
+        self.assertEqual(cm.exception.code, 'retry')
+        self.assertEqual(breaker.slow_count, 1)
+
+    def test_other_database_errors_raised(self):
+        breaker = self.make_breaker(fallback=CACHED)
+        breaker.call('key', lambda: True)
+
+        def lost_connection():
+            raise OperationalError(2013, 'Lost connection to MySQL server')
+
+        self.assertRaises(
+            OperationalError, breaker.call, 'key', lost_connection)
+        self.assertEqual(breaker.slow_count, 0)
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_is_timeout(self):
+        self.assertTrue(is_timeout(OperationalError(MYSQL_QUERY_TIMEOUT, '')))
+        cause = mock.Mock(pgcode=POSTGRESQL_QUERY_CANCELED)
+        exc = OperationalError('canceling statement due to statement timeout')
+        exc.__cause__ = cause
+        self.assertTrue(is_timeout(exc))
+        self.assertFalse(is_timeout(OperationalError('database is locked')))
+
+    def test_open_rejects_without_lookup(self):
+        breaker = self.make_breaker(threshold=1)
+        breaker.call('key', slow_lookup)
+        calls = []
+        with self.assertRaises(forms.ValidationError) as cm:
+            breaker.call('key', lambda: calls.append(1))
+        self.assertEqual(cm.exception.code, 'retry')
+        self.assertEqual(calls, [])
+
+    def test_open_returns_cached(self):
+        breaker = self.make_breaker(threshold=1, fallback=CACHED)
+        breaker.call('key', lambda: False)
+        breaker.call('other', slow_lookup)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.call('key', lambda: True))
+        self.assertRaises(
+            forms.ValidationError, breaker.call, 'missing', lambda: True)
+
+    def test_open_does_not_use_cached_if_not_cacheable(self):
+        breaker = self.make_breaker(threshold=1, fallback=CACHED)
+        breaker.call('key', lambda: True, cacheable=False)
+        breaker.call('other', slow_lookup)
+        with self.assertRaises(forms.ValidationError) as cm:
+            breaker.call('key', lambda: True, cacheable=False)
+        self.assertEqual(cm.exception.code, 'retry')
+
+    def test_lookup_in_flight_when_tripped_does_not_close(self):
+        breaker = self.make_breaker(threshold=1)
+
+        def lookup_while_tripped():
+            breaker.call('other', slow_lookup)
+            return True
+
+        self.assertTrue(breaker.call('key', lookup_while_tripped))
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.trip_count, 1)
+
+    def test_half_open_admits_one_probe(self):
+        breaker = self.make_breaker(threshold=1, reset_timeout=0.01)
+        breaker.call('key', slow_lookup)
+        time.sleep(0.02)
+        self.assertEqual(breaker.state, HALF_OPEN)
+
+        def probe():
+            self.assertRaises(
+                forms.ValidationError, breaker.call, 'other', lambda: True)
+            return 1
+
+        self.assertEqual(breaker.call('key', probe), 1)
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_half_open_probe_released_on_error(self):
+        breaker = self.make_breaker(threshold=1, reset_timeout=0.01)
+        breaker.call('key', slow_lookup)
+        time.sleep(0.02)
+
+        def fail():
+            raise ValueError()
+
+        self.assertRaises(ValueError, breaker.call, 'key', fail)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertEqual(breaker.call('key', lambda: 1), 1)
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_half_open_probe_released_on_interrupt(self):
+        breaker = self.make_breaker(threshold=1, reset_timeout=0.01)
+        breaker.call('key', slow_lookup)
+        time.sleep(0.02)
+
+        def interrupted():
+            raise KeyboardInterrupt()
+
+        self.assertRaises(KeyboardInterrupt, breaker.call, 'key', interrupted)
+        self.assertEqual(breaker.call('key', lambda: 1), 1)
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_half_open_reopens_on_slow_lookup(self):
+        breaker = self.make_breaker(threshold=2, reset_timeout=0.01)
+        breaker.call('key', slow_lookup)
+        breaker.call('key', slow_lookup)
+        time.sleep(0.02)
+        breaker.call('key', slow_lookup)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.trip_count, 2)
+
+    def test_reset(self):
+        breaker = self.make_breaker(threshold=1)
+        breaker.call('key', slow_lookup)
+        breaker.reset()
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.trip_count, 0)
+
+
+class TestStatementTimeout(TestCase):
+
+    def patch_connection(self, vendor):
+        connection = connections[DEFAULT_DB_ALIAS]
+        vendor_patcher = mock.patch.object(connection, 'vendor', vendor)
+        cursor_patcher = mock.patch.object(connection, 'cursor')
+        vendor_patcher.start()
+        cursor = cursor_patcher.start()
+        self.addCleanup(vendor_patcher.stop)
+        self.addCleanup(cursor_patcher.stop)
+        return cursor.return_value.__enter__.return_value
+
+    def executed_sql(self, cursor):
+        return [c[1] for c in cursor.execute.mock_calls]
+
+    def test_sqlite_noop(self):
+        cursor = self.patch_connection('sqlite')
+        with statement_timeout(2):
+            pass
+        cursor.execute.assert_not_called()
+
+    def test_postgresql(self):
+        cursor = self.patch_connection('postgresql')
+        with statement_timeout(2):
+            pass
+        sql = self.executed_sql(cursor)
+        self.assertIn(('SET LOCAL statement_timeout = %s', [2000]), sql)
+        self.assertFalse([s for s in sql if 'RESET' in s[0]])
+        self.assertFalse(connections[DEFAULT_DB_ALIAS].needs_rollback)
+
+    def test_mysql(self):
+        cursor = self.patch_connection('mysql')
+        with statement_timeout(2):
+            pass
+        self.assertEqual(
+            self.executed_sql(cursor),
+            [('SET SESSION max_execution_time = %s', [2000]),
+             ('SET SESSION max_execution_time = DEFAULT',)])
+
+    def test_mysql_reset_error_does_not_hide_original(self):
+        cursor = self.patch_connection('mysql')
+        cursor.execute.side_effect = [None, DatabaseError('gone away')]
+        with self.assertRaises(OperationalError):
+            with statement_timeout(2):
+                timed_out_lookup()
+
+
+@override_settings(PLOT_FORM_VALIDATORS_LOOKUP_TIMEOUT=0.01,
+                   PLOT_FORM_VALIDATORS_BREAKER_THRESHOLD=1,
+                   PLOT_FORM_VALIDATORS_BREAKER_RESET_TIMEOUT=60)
+class TestValidatorFallback(TestCase):
+
+    def setUp(self):
+        circuit_breaker.reset()
+        self.addCleanup(circuit_breaker.reset)
+        self.plot = Plot.objects.create(confirmed=True)
+        self.plot_log = PlotLog.objects.create(plot=self.plot)
+        PlotLogEntry.objects.create(
+            plot_log=self.plot_log, log_status=ACCESSIBLE)
+        self.cleaned_data = dict(map_area='leiden', ess=True)
+
+    def trip(self):
+        circuit_breaker.call('trip', slow_lookup)
+        self.assertEqual(circuit_breaker.state, OPEN)
+
+    @override_settings(PLOT_FORM_VALIDATORS_BREAKER_FALLBACK=REJECT)
+    def test_plot_form_validator_rejects(self):
+        self.trip()
+        form_validator = PlotFormValidator(
+            instance=self.plot, cleaned_data=self.cleaned_data)
+        self.assertRaises(forms.ValidationError, form_validator.validate)
+        self.assertIn('retry', form_validator._error_codes)
+
+    @override_settings(PLOT_FORM_VALIDATORS_BREAKER_FALLBACK=CACHED)
+    def test_plot_form_validator_uses_cached(self):
+        PlotFormValidator(
+            instance=self.plot, cleaned_data=self.cleaned_data).validate()
+        self.trip()
+        PlotLogEntry.objects.all().delete()
+        form_validator = PlotFormValidator(
+            instance=self.plot, cleaned_data=self.cleaned_data)
+        try:
+            form_validator.validate()
+        except forms.ValidationError as e:
+            self.fail(f'ValidationError unexpectedly raised. Got {e}')
+
+    @override_settings(PLOT_FORM_VALIDATORS_BREAKER_FALLBACK=CACHED)
+    def test_supervisor_check_never_cached(self):
+        user = User.objects.create(username='erik')
+        user.groups.add(Group.objects.create(name='supervisor'))
+        self.cleaned_data.update(target_radius=5)
+        options = dict(
+            instance=self.plot, supervisor_groups=['supervisor'],
+            current_user=user, cleaned_data=self.cleaned_data)
+        PlotFormValidator(**options).validate()
+        self.trip()
+        form_validator = PlotFormValidator(**options)
+        self.assertRaises(forms.ValidationError, form_validator.validate)
+        self.assertIn('retry', form_validator._error_codes)
+
+    @override_settings(PLOT_FORM_VALIDATORS_BREAKER_FALLBACK=REJECT)
+    def test_plot_log_entry_form_validator_rejects(self):
+        self.trip()
+        form_validator = PlotLogEntryFormValidator(cleaned_data=dict(
+            plot_log=self.plot_log, log_status=INACCESSIBLE, reason='flood'))
+        self.assertRaises(forms.ValidationError, form_validator.validate)
+        self.assertIn('retry', form_validator._error_codes)
@@ -0,0 +1,129 @@
+from django import forms
+from django.forms import inlineformset_factory
+from django.test import TestCase, tag
+from unittest import mock
+
+from plot.constants import ACCESSIBLE, INACCESSIBLE
+
+from ..plot_log_entry_formset_validator import PlotLogEntryFormSetValidator
+from .models import Plot, PlotLog, PlotLogEntry
+
+
+PlotLogEntryFormSet = inlineformset_factory(
+    PlotLog, PlotLogEntry, fields=['log_status'], extra=1)
+
+
+class TestPlotLogEntryFormSetValidator(TestCase):
+
+    def setUp(self):
+        self.plot = Plot.objects.create(confirmed=True)
+        plot_log = PlotLog.objects.create(plot=self.plot)
+        for _ in range(5):
+            PlotLogEntry.objects.create(
+                plot_log=plot_log, log_status=ACCESSIBLE)
+        # a historical entry, saved before the plot was confirmed
+        PlotLogEntry.objects.create(
+            plot_log=plot_log, log_status=INACCESSIBLE)
+        self.plot_log = PlotLog.objects.get(pk=plot_log.pk)
+
+    def make_formset(self, changes=None, new_log_status=None):
+        changes = changes or {}
+        prefix = PlotLogEntryFormSet.get_default_prefix()
+        entries = list(self.plot_log.plotlogentry_set.order_by('pk'))
+        data = {
+            f'{prefix}-TOTAL_FORMS': str(len(entries) + 1),
+            f'{prefix}-INITIAL_FORMS': str(len(entries)),
+            f'{prefix}-MIN_NUM_FORMS': '0',
+            f'{prefix}-MAX_NUM_FORMS': '1000'}
+        for index, entry in enumerate(entries):
+            data.update({
+                f'{prefix}-{index}-id': str(entry.pk),
+                f'{prefix}-{index}-plot_log': str(self.plot_log.pk),
+                f'{prefix}-{index}-log_status': changes.get(
+                    index, entry.log_status)})
+        if new_log_status:
+            data.update({
+                f'{prefix}-{len(entries)}-plot_log': str(self.plot_log.pk),
+                f'{prefix}-{len(entries)}-log_status': new_log_status})
+        formset = PlotLogEntryFormSet(data=data, instance=self.plot_log)
+        formset.is_valid()
+        return formset
+
+    def test_unchanged_forms_skipped(self):
+        formset = self.make_formset()
+        validator = PlotLogEntryFormSetValidator(
+            forms=formset.forms, plot_log=self.plot_log)
+        self.assertEqual(validator.changed_forms, [])
+        with self.assertNumQueries(0):
+            validator.validate()
+
+    def test_new_accessible_entry_ok(self):
+        formset = self.make_formset(new_log_status=ACCESSIBLE)
+        validator = PlotLogEntryFormSetValidator(
+            forms=formset.forms, plot_log=self.plot_log)
+        try:
+            validator.validate()
+        except forms.ValidationError as e:
+            self.fail(f'ValidationError unexpectedly raised. Got {e}')
+
+    def test_new_inaccessible_entry_for_confirmed_plot(self):
+        formset = self.make_formset(new_log_status=INACCESSIBLE)
+        validator = PlotLogEntryFormSetValidator(
+            forms=formset.forms, plot_log=self.plot_log)
+        self.assertRaises(forms.ValidationError, validator.validate)
+        self.assertEqual(list(validator._errors), [6])
+        self.assertIn('log_status', validator._errors[6])
+        self.assertIn('log_status', formset.forms[6].errors)
+        self.assertFalse(formset.is_valid())
+
+    def test_changed_entry_to_inaccessible_for_confirmed_plot(self):
+        formset = self.make_formset(changes={2: INACCESSIBLE})
+        validator = PlotLogEntryFormSetValidator(
+            forms=formset.forms, plot_log=self.plot_log)
+        self.assertRaises(forms.ValidationError, validator.validate)
+        self.assertEqual(list(validator._errors), [2])
+        self.assertIn('log_status', formset.forms[2].errors)
+        self.assertFalse(formset.forms[1].errors)
+
+    def test_forms_with_field_errors_skipped(self):
+        formset = self.make_formset(changes={2: 'x' * 26})
+        self.assertIn('log_status', formset.forms[2].errors)
+        validator = PlotLogEntryFormSetValidator(
+            forms=formset.forms, plot_log=self.plot_log)
+        self.assertEqual(validator.changed_forms, [])
+
+    def test_plot_loaded_once(self):
+        formset = self.make_formset(
+            changes={0: INACCESSIBLE, 1: INACCESSIBLE},
+            new_log_status=INACCESSIBLE)
+        validator = PlotLogEntryFormSetValidator(
+            forms=formset.forms, plot_log=self.plot_log)
+        with self.assertNumQueries(1):
+            self.assertRaises(forms.ValidationError, validator.validate)
+        self.assertEqual(list(validator._errors), [0, 1, 6])
+
+    def test_plot_log_required(self):
+        validator = PlotLogEntryFormSetValidator(forms=[], plot_log=None)
+        self.assertRaises(forms.ValidationError, validator.validate)
+        self.assertIn('plot_log', validator._error_codes)
+
+    def test_unsaved_plot_log_keyed_on_plot(self):
+        plot = Plot.objects.create(confirmed=True)
+        plot_log = PlotLog(plot=plot)
+        prefix = PlotLogEntryFormSet.get_default_prefix()
+        data = {
+            f'{prefix}-TOTAL_FORMS': '1',
+            f'{prefix}-INITIAL_FORMS': '0',
+            f'{prefix}-MIN_NUM_FORMS': '0',
+            f'{prefix}-MAX_NUM_FORMS': '1000',
+            f'{prefix}-0-log_status': INACCESSIBLE}
+        formset = PlotLogEntryFormSet(data=data, instance=plot_log)
+        formset.is_valid()
+        validator = PlotLogEntryFormSetValidator(
+            forms=formset.forms, plot_log=plot_log)
+        with mock.patch(
+                'plot_form_validators.plot_log_entry_formset_validator.lookup',
+                return_value=True) as lookup:
+            self.assertRaises(forms.ValidationError, validator.validate)
+        self.assertEqual(lookup.call_args[0][0], ('plot_confirmed', plot.id))
+        self.assertIn('log_status', formset.forms[0].errors)
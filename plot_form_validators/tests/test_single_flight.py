@@ -0,0 +1,193 @@
+import threading
+import time
+
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TransactionTestCase, tag
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
+
+from plot.constants import ACCESSIBLE
+
+from ..lookup import circuit_breaker, lookup, single_flight
+from ..plot_form_validator import PlotFormValidator
+from ..single_flight import SingleFlight
+from .models import Plot, PlotLog, PlotLogEntry
+
+TIMEOUT = 5
+
+
+class TestSingleFlight(SimpleTestCase):
+
+    def setUp(self):
+        self.single_flight = SingleFlight()
+        self.calls = []
+        self.release = threading.Event()
+
+    def slow_lookup(self, value):
+        self.calls.append(value)
+        self.release.wait(timeout=TIMEOUT)
+        return value
+
+    def wait_for_callers(self, key, count):
+        deadline = time.monotonic() + TIMEOUT
+        while self.single_flight.callers(key) < count:
+            if time.monotonic() > deadline:
+                self.release.set()
+                self.fail(f'Timed out waiting for {count} callers on {key}.')
+            time.sleep(0.001)
+
+    def run_concurrently(self, keys):
+        results = {}
+
+        def target(index, key):
+            results[index] = self.single_flight.do(key, self.slow_lookup, key)
+
+        threads = [threading.Thread(target=target, args=(index, key))
+                   for index, key in enumerate(keys)]
+        for thread in threads:
+            thread.start()
+        for key in set(keys):
+            self.wait_for_callers(key, keys.count(key))
+        self.release.set()
+        for thread in threads:
+            thread.join(timeout=TIMEOUT)
+            self.assertFalse(thread.is_alive())
+        return results
+
+    def test_same_key_shares_one_call(self):
+        results = self.run_concurrently([('plot_log', 1)] * 5)
+        self.assertEqual(self.calls, [('plot_log', 1)])
+        self.assertEqual(list(results.values()), [('plot_log', 1)] * 5)
+
+    def test_different_keys_do_not_share(self):
+        results = self.run_concurrently([('plot_log', 1), ('plot_log', 2)])
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(results, {0: ('plot_log', 1), 1: ('plot_log', 2)})
+
+    def test_result_not_kept_after_call(self):
+        self.release.set()
+        self.single_flight.do('key', self.slow_lookup, 1)
+        self.single_flight.do('key', self.slow_lookup, 2)
+        self.assertEqual(self.calls, [1, 2])
+        self.assertEqual(self.single_flight.in_flight, 0)
+
+    def test_exception_raised_and_cleared(self):
+        def fail():
+            raise ValueError('db down')
+        self.assertRaises(ValueError, self.single_flight.do, 'key', fail)
+        self.assertEqual(self.single_flight.in_flight, 0)
+        self.assertEqual(self.single_flight.do('key', lambda: 1), 1)
+
+    def test_waiters_raise_own_exception(self):
+        exceptions = []
+
+        def fail():
+            self.release.wait(timeout=TIMEOUT)
+            raise ValueError('db down')
+
+        def target():
+            try:
+                self.single_flight.do('key', fail)
+            except ValueError as e:
+                exceptions.append(e)
+
+        threads = [threading.Thread(target=target) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        self.wait_for_callers('key', 3)
+        self.release.set()
+        for thread in threads:
+            thread.join(timeout=TIMEOUT)
+        self.assertEqual(len(exceptions), 3)
+        self.assertEqual(len(set(id(e) for e in exceptions)), 3)
+
+    def test_waiters_raise_if_leader_interrupted(self):
+        exceptions = []
+
+        def interrupted():
+            self.release.wait(timeout=TIMEOUT)
+            raise KeyboardInterrupt()
+
+        def target():
+            try:
+                exceptions.append(self.single_flight.do('key', interrupted))
+            except BaseException as e:
+                exceptions.append(e)
+
+        threads = [threading.Thread(target=target) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        self.wait_for_callers('key', 3)
+        self.release.set()
+        for thread in threads:
+            thread.join(timeout=TIMEOUT)
+        self.assertEqual(len(exceptions), 3)
+        for e in exceptions:
+            self.assertIsInstance(e, KeyboardInterrupt)
+
+
+class TestLookup(TransactionTestCase):
+
+    def test_lookup_shared_outside_atomic_block(self):
+        with mock.patch.object(single_flight, 'do') as do:
+            lookup('key', lambda: 1)
+        do.assert_called_once()
+
+    def test_lookup_not_shared_inside_atomic_block(self):
+        with transaction.atomic():
+            with mock.patch.object(single_flight, 'do') as do:
+                self.assertEqual(lookup('key', lambda: 1), 1)
+        do.assert_not_called()
+
+
+class TestPlotFormValidatorLookup(TransactionTestCase):
+
+    def setUp(self):
+        circuit_breaker.reset()
+        self.plot = Plot.objects.create()
+        plot_log = PlotLog.objects.create(plot=self.plot)
+        PlotLogEntry.objects.create(plot_log=plot_log, log_status=ACCESSIBLE)
+
+    def test_concurrent_validators_share_one_query(self):
+        key = ('plot_log', self.plot.id)
+        original = PlotFormValidator.has_accessible_plot_log_entry
+        release = threading.Event()
+        queries = []
+        errors = []
+
+        def blocking_lookup(form_validator):
+            release.wait(timeout=TIMEOUT)
+            return original(form_validator)
+
+        def target():
+            try:
+                form_validator = PlotFormValidator(
+                    instance=Plot.objects.get(pk=self.plot.pk),
+                    cleaned_data=dict(map_area='leiden', ess=True))
+                with CaptureQueriesContext(connection) as context:
+                    form_validator.validate()
+                queries.extend(
+                    q['sql'] for q in context.captured_queries
+                    if 'plotlogentry' in q['sql'])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=target) for _ in range(2)]
+        with mock.patch.object(
+                PlotFormValidator, 'has_accessible_plot_log_entry',
+                blocking_lookup):
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + TIMEOUT
+            while single_flight.callers(key) < 2:
+                if time.monotonic() > deadline:
+                    release.set()
+                    self.fail('Timed out waiting for both validators.')
+                time.sleep(0.001)
+            release.set()
+            for thread in threads:
+                thread.join(timeout=TIMEOUT)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(queries), 1)